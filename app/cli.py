@@ -1,12 +1,13 @@
 import argparse
 
-from . import config, controller
+from . import config
+from .pattern.matcher import Matcher
 
 # Constants
 
 
 EXE_NAME = 'umlens'
-ALL_PATTERNS = controller.matchers.keys()
+ALL_PATTERNS = list(Matcher.by_name())
 
 
 # CLI parser
@@ -49,6 +50,9 @@ def build_parser() -> argparse.ArgumentParser:
                        required=True)
     group.add_argument('-o', '--output',
                        help='Output file path.')
+    group.add_argument('--indent',
+                       type=int,
+                       help='Indentation of the JSON output (compact if omitted).')
 
     # Main parser
     main_parser = argparse.ArgumentParser(prog=EXE_NAME,
@@ -98,12 +102,17 @@ def build_parser() -> argparse.ArgumentParser:
 
 
 def patterns_sub(args) -> int:
-    return controller.detect_patterns(args.input, output_path=args.output, patterns=args.pattern)
+    from . import controller
+    return controller.detect_patterns(args.input, output_path=args.output, patterns=args.pattern,
+                                      indent=args.indent)
 
 
 def cycles_sub(args) -> int:
-    return controller.detect_cycles(args.input, output_path=args.output)
+    from . import controller
+    return controller.detect_cycles(args.input, output_path=args.output, indent=args.indent)
 
 
 def metrics_sub(args) -> int:
-    return controller.compute_metrics(args.input, config_path=args.config, output_path=args.output)
+    from . import controller
+    return controller.compute_metrics(args.input, config_path=args.config, output_path=args.output,
+                                      indent=args.indent)
@@ -1,47 +1,48 @@
+from operator import attrgetter
 from typing import Optional
 
 from .factory import AppFactory
 from .pattern.matcher import Matcher
 from .util import json
 
-matchers = {p.__name__.lower(): m for p, m in Matcher.all().items()}
-
 
 def detect_patterns(input_path: str, output_path: Optional[str] = None,
-                    patterns: Optional[str] = None) -> int:
+                    patterns: Optional[str] = None, indent: Optional[int] = None) -> int:
+    matchers = Matcher.by_name()
     enabled_matchers = (matchers[p] for p in patterns) if patterns else matchers.values()
     patterns = AppFactory(input_path).create_pattern_finder(enabled_matchers).patterns()
 
     if output_path:
-        json.encode_patterns(patterns, output_path)
+        json.encode_patterns(patterns, output_path, indent=indent)
     else:
-        for pattern in sorted(patterns):
+        for pattern in sorted(patterns, key=attrgetter('name')):
             print(pattern)
 
     return 0
 
 
-def detect_cycles(input_path: str, output_path: Optional[str] = None) -> int:
+def detect_cycles(input_path: str, output_path: Optional[str] = None,
+                  indent: Optional[int] = None) -> int:
     finder = AppFactory(input_path).create_cycle_finder()
     cycles = finder.cycles()
 
     if output_path:
-        json.encode_cycles(cycles, output_path)
+        json.encode_cycles(cycles, output_path, indent=indent)
     else:
         print('Dependency cycles: {}'.format(finder.cycle_count()))
-        for cycle in sorted(cycles):
+        for cycle in sorted(cycles, key=repr):
             print(cycle)
 
     return 0
 
 
 def compute_metrics(diagram_path: str, config_path: Optional[str] = None,
-                    output_path: Optional[str] = None) -> int:
+                    output_path: Optional[str] = None, indent: Optional[int] = None) -> int:
     metric_aggregator = AppFactory(diagram_path).create_metrics(config_path)
     metrics = metric_aggregator.compute_metrics()
 
     if output_path:
-        json.encode_metrics(metrics, output_path)
+        json.encode_metrics(metrics, output_path, indent=indent)
     else:
         for metric in metrics:
             print(metric)
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from typing import Iterator, List, Set
+from typing import Dict, Iterator, List, Set, Tuple
 
 from app.uml.model import Class, Diagram
-from .search import Node
+from app.util import graph
+from app.util.decorators import cached_property
 
 
 class Cycle:
@@ -11,44 +12,23 @@ class Cycle:
 
     def __init__(self, involved_classes: List[Class]):
         self.involved_classes = involved_classes
+        self._repr = ', '.join(c.name for c in involved_classes)
 
-    def __eq__(self, other: Cycle) -> bool:
-        # Cycle equality must be checked cyclically.
-        if len(self.involved_classes) != len(other.involved_classes):
-            return False
-
-        cls_len = len(self.involved_classes)
-
-        if cls_len == 0:
-            return True
-
-        new_list = self.involved_classes * 2
-
-        for x in range(cls_len):
-            z = 0
-            for y in range(x, x + cls_len):
-                if other.involved_classes[z] == new_list[y]:
-                    z += 1
-                else:
-                    break
+        # Cycle equality must be checked cyclically: store the minimal rotation.
+        start = _least_rotation([c.identifier for c in involved_classes])
+        self._canon = tuple(involved_classes[start:] + involved_classes[:start])
 
-            if z == cls_len:
-                return True
-
-        return False
+    def __eq__(self, other: Cycle) -> bool:
+        return self._canon == other._canon
 
     def __hash__(self):
-        # Hash must be invariant wrt cyclic equality.
-        hval = 0
-        for cls in self.involved_classes:
-            hval ^= cls.__hash__()
-        return hval
+        return hash(self._canon)
 
     def __lt__(self, other: Cycle) -> bool:
-        return self.__repr__() < other.__repr__()
+        return self._repr < other._repr
 
     def __repr__(self) -> str:
-        return ', '.join(c.name for c in self.involved_classes)
+        return self._repr
 
 
 class CycleFinder:
@@ -58,7 +38,8 @@ class CycleFinder:
 
     def __init__(self, diagram: Diagram):
         self._diag = diagram
-        self._cycles: Set[Cycle] = set()
+        self._cycles: List[Cycle] = []
+        self._computed = False
 
     def cycle_count(self) -> int:
         self._find_cycles()
@@ -68,18 +49,65 @@ class CycleFinder:
         self._find_cycles()
         yield from self._cycles
 
+    @cached_property
+    def classes_in_cycles(self) -> Set[Class]:
+        classes, _, components = self._graph
+        return {classes[i] for component in components for i in component}
+
     # Private
 
     def _find_cycles(self) -> None:
-        if self._cycles:
+        if self._computed:
             return
 
-        for cls in self._diag.classes():
-            node = Node(self._diag, cls)
-
-            for solution in node.search(cls):
-                path = solution.path_to_root()
-                path.pop()
-
-                if len(path):
-                    self._cycles.add(Cycle(path))
+        # Every cycle lies within a single strongly connected component.
+        classes, adj, components = self._graph
+        component_of: Dict[int, Set[int]] = {}
+
+        for component in components:
+            component_of.update(dict.fromkeys(component, set(component)))
+
+        # Searching from classes in diagram order, each cycle starts from its earliest class.
+        cycles: Dict[Cycle, None] = {}
+
+        for start in sorted(component_of):
+            for path in graph.cycles_through(adj, start, component_of[start]):
+                cycles.setdefault(Cycle([classes[i] for i in path]))
+
+        self._cycles.extend(cycles)
+        self._computed = True
+
+    @cached_property
+    def _graph(self) -> Tuple[List[Class], graph.Adjacency, List[List[int]]]:
+        classes = list(self._diag.classes())
+        index = {c: i for i, c in enumerate(classes)}
+        adj = [list(dict.fromkeys(index[r] for r in self._diag.related_classes(c)))
+               for c in classes]
+        components = [c for c in graph.strongly_connected_components(adj)
+                      if graph.has_cycle(adj, c)]
+        return classes, adj, components
+
+
+def _least_rotation(seq: List[str]) -> int:
+    """Returns the start index of the lexicographically minimal rotation (Booth's algorithm)."""
+    seq = seq * 2
+    failure = [-1] * len(seq)
+    k = 0
+
+    for j in range(1, len(seq)):
+        cur = seq[j]
+        i = failure[j - k - 1]
+
+        while i != -1 and cur != seq[k + i + 1]:
+            if cur < seq[k + i + 1]:
+                k = j - i - 1
+            i = failure[i]
+
+        if cur != seq[k + i + 1]:
+            if cur < seq[k]:
+                k = j
+            failure[j - k] = -1
+        else:
+            failure[j - k] = i + 1
+
+    return k
@@ -1,4 +1,4 @@
-from typing import Any, Iterable, Optional, Type
+from typing import Any, Dict, Iterable, Optional, Type
 
 from .cycle.finder import CycleFinder
 from .metric.aggregator import MetricAggregator
@@ -8,23 +8,27 @@ from .pattern.matcher import Matcher
 from .uml import model as cd
 from .uml.parser import Parser
 from .util import json
-from .util.decorators import memoized
 
 MatcherType = Type[mt.Matcher]
 
 
 class AppFactory:
 
+    __slots__ = ('diagram_path', '_diagram', '_matchers')
+
     def __init__(self, diagram_path: str):
         self.diagram_path = diagram_path
+        self._diagram: Optional[cd.Diagram] = None
+        self._matchers: Dict[MatcherType, mt.Matcher] = {}
 
     @classmethod
     def create_parser(cls) -> Parser:
         return Parser()
 
-    @memoized
     def create_diagram(self) -> cd.Diagram:
-        return self.create_parser().parse_document(self.diagram_path)
+        if self._diagram is None:
+            self._diagram = self.create_parser().parse_document(self.diagram_path)
+        return self._diagram
 
     def create_cycle_finder(self) -> CycleFinder:
         return CycleFinder(self.create_diagram())
@@ -43,9 +47,15 @@ class AppFactory:
         return MetricAggregator(self.create_diagram(), self.create_cycle_finder(),
                                 self.create_pattern_finder(), config)
 
-    @memoized
     def create_matcher(self, cls: Type[mt.Matcher]) -> Any:
-        if cls == mt.AbstractFactoryMatcher:
-            return mt.AbstractFactoryMatcher(self.create_matcher(mt.FactoryMethodMatcher))
-        else:
-            return cls()
+        matcher = self._matchers.get(cls)
+
+        if matcher is None:
+            if cls == mt.AbstractFactoryMatcher:
+                matcher = mt.AbstractFactoryMatcher(self.create_matcher(mt.FactoryMethodMatcher))
+            else:
+                matcher = cls()
+
+            self._matchers[cls] = matcher
+
+        return matcher
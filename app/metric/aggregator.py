@@ -3,14 +3,16 @@ from typing import Dict, List, Optional, Type
 from app.cycle.finder import CycleFinder
 from app.pattern.finder import PatternFinder
 from app.uml.model import Diagram
-from app.util.decorators import memoized
+from app.util.decorators import cached_property
 from .model import (
     AvgInheritanceDepth, AvgMethodsPerClass, AvgRelationshipsPerClass, Classes, ClassesInCycle,
     ClassesInCycleRatio, ClassesInPattern, ClassesInPatternRatio, ComputedMetric, DependencyCycles,
-    DevelopmentCost, MethodInstances, Metric, Packages, PatternTypes, RelationshipInstances,
-    RemediationCost, TechnicalDebtRatio
+    DevelopmentCost, DiagramStats, MethodInstances, Metric, Packages, PatternTypes,
+    RelationshipInstances, RemediationCost, TechnicalDebtRatio
 )
 
+_missing = object()
+
 
 class MetricAggregator:
 
@@ -20,19 +22,49 @@ class MetricAggregator:
         self._cfinder = cycle_finder
         self._pfinder = pattern_finder
         self._config = config
+        self._computed_metrics: Dict[Type[ComputedMetric], ComputedMetric] = {}
 
     def compute_metrics(self) -> List[Metric]:
-        metrics = self._base_metrics().copy()
+        metrics = self._base_metrics.copy()
         metrics.append(self._development_cost())
         metrics.append(self._remediation_cost())
         metrics.append(self._technical_debt_ratio())
         return metrics
 
-    @memoized
+    @cached_property
+    def _stats(self) -> DiagramStats:
+        diag = self._diag
+        in_pattern = self._pfinder.classes_in_patterns
+        in_cycle = self._cfinder.classes_in_cycles
+
+        stats = DiagramStats(packages=sum(1 for _ in diag.packages()),
+                             pattern_types=len(self._pfinder.pattern_type_names),
+                             cycles=self._cfinder.cycle_count())
+
+        depths = diag.all_inheritance_depths()
+
+        for c in diag.classes():
+            stats.classes += 1
+            stats.methods += sum(1 for _ in diag.methods(c))
+            stats.relationships += sum(1 for _ in diag.relationships(c))
+            stats.classes_in_pattern += c in in_pattern
+            stats.classes_in_cycle += c in in_cycle
+
+            if not (c.is_interface or diag.has_sub_classes(c)) and diag.has_super_classes(c):
+                stats.leaf_classes += 1
+                stats.leaf_inheritance_depth += depths[c]
+
+        return stats
+
     def _computed_metric(self, mtype: Type[ComputedMetric]) -> ComputedMetric:
-        return mtype(self._diag, self._cfinder, self._pfinder)
+        metric = self._computed_metrics.get(mtype)
+
+        if metric is None:
+            metric = self._computed_metrics[mtype] = mtype(self._stats)
+
+        return metric
 
-    @memoized
+    @cached_property
     def _base_metrics(self) -> List[Metric]:
         metrics = [self._computed_metric(mtype)
                    for mtype in (Packages, Classes, PatternTypes, ClassesInPattern,
@@ -50,8 +82,15 @@ class MetricAggregator:
         return metrics
 
     def _remediation_cost(self) -> RemediationCost:
-        return RemediationCost([(m, self._config[m.identifier])
-                                for m in self._base_metrics() if m.identifier in self._config])
+        weighted = []
+
+        for m in self._base_metrics:
+            weight = self._config.get(m.identifier, _missing)
+
+            if weight is not _missing:
+                weighted.append((m, weight))
+
+        return RemediationCost(weighted)
 
     def _development_cost(self) -> DevelopmentCost:
         return DevelopmentCost(self._config.get(DevelopmentCost.id(), 0.0))
@@ -1,23 +1,39 @@
 from __future__ import annotations
 
+import math
 import re
 import sys
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from operator import attrgetter, mul
 from typing import Generic, Iterable, Tuple, TypeVar, Union
 
-from app.cycle.finder import CycleFinder
-from app.pattern.finder import PatternFinder
-from app.uml.model import Diagram
-from app.util.decorators import cached_property, memoized
+from app.util.decorators import cached_property
 
 MetricValue = Union[int, float]
 metric_eps = sys.float_info.epsilon
 metric_inf = float('inf')
+_metric_value = attrgetter('value')
 
 Numerator = TypeVar('Numerator', bound='Metric')
 Denominator = TypeVar('Denominator', bound='Metric')
 
 
+@dataclass
+class DiagramStats:
+    """Figures collected in a single scan of the diagram, shared by computed metrics."""
+    packages: int = 0
+    classes: int = 0
+    methods: int = 0
+    relationships: int = 0
+    pattern_types: int = 0
+    classes_in_pattern: int = 0
+    cycles: int = 0
+    classes_in_cycle: int = 0
+    leaf_classes: int = 0
+    leaf_inheritance_depth: int = 0
+
+
 class Metric(ABC):
     """Models metrics and their computation."""
     _CC_REGEX = re.compile(r'(?<!^)(?=[A-Z])')
@@ -31,21 +47,26 @@ class Metric(ABC):
 
     # Public
 
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._id = cls._CC_REGEX.sub('_', cls.__name__).lower()
+        cls._name = cls._CC_REGEX.sub(' ', cls.__name__).lower().capitalize()
+
     @classmethod
-    @memoized
     def id(cls) -> str:
-        return cls._CC_REGEX.sub('_', cls.__name__).lower()
+        return cls._id
 
-    @cached_property
+    @property
     def name(self) -> str:
-        return self._CC_REGEX.sub(' ', self.__class__.__name__).lower().capitalize()
+        return self._name
 
     @property
     def identifier(self) -> str:
-        return self.id()
+        return self._id
 
     def __repr__(self) -> str:
-        val = format(self.value, '.2f') if isinstance(self.value, float) else self.value
+        val = self.value
+        val = format(val, '.2f') if isinstance(val, float) else val
         return '{}: {}'.format(self.name, val)
 
 
@@ -75,10 +96,8 @@ class ComputedMetric(Metric, ABC):
     def value(self) -> MetricValue:
         return self._compute()
 
-    def __init__(self, diagram: Diagram, cycle_finder: CycleFinder, pattern_finder: PatternFinder):
-        self._diag = diagram
-        self._cfinder = cycle_finder
-        self._pfinder = pattern_finder
+    def __init__(self, stats: DiagramStats):
+        self._stats = stats
 
 
 class RatioMetric(Generic[Numerator, Denominator], Metric):
@@ -107,39 +126,41 @@ class LinearCombinationMetric(Metric):
     """Models metrics that can be obtained as linear combinations of other metrics."""
 
     def __init__(self, metrics: Iterable[Tuple[Metric, float]]):
-        self.metrics = metrics
+        self.metrics = tuple(metrics)
+        self._components = tuple(m for m, _ in self.metrics)
+        self._weights = tuple(w for _, w in self.metrics)
 
     @property
     def value(self) -> MetricValue:
-        return float(sum(m[0].value * m[1] for m in self.metrics))
+        return math.fsum(map(mul, map(_metric_value, self._components), self._weights))
 
 
 class Packages(ComputedMetric):
     """Number of package."""
 
     def _compute(self) -> MetricValue:
-        return sum(1 for _ in self._diag.packages())
+        return self._stats.packages
 
 
 class Classes(ComputedMetric):
     """Number of classes."""
 
     def _compute(self) -> MetricValue:
-        return sum(1 for _ in self._diag.classes())
+        return self._stats.classes
 
 
 class PatternTypes(ComputedMetric):
     """Number of different design patterns."""
 
     def _compute(self) -> MetricValue:
-        return len({p.name for p in self._pfinder.patterns()})
+        return self._stats.pattern_types
 
 
 class ClassesInPattern(ComputedMetric):
     """Number of classes involved in patterns."""
 
     def _compute(self) -> MetricValue:
-        return len({c for p in self._pfinder.patterns() for c in p.involved_classes})
+        return self._stats.classes_in_pattern
 
 
 class ClassesInPatternRatio(RatioMetric[ClassesInPattern, Classes]):
@@ -151,14 +172,14 @@ class DependencyCycles(ComputedMetric):
     """Number of dependency cycles."""
 
     def _compute(self) -> MetricValue:
-        return self._cfinder.cycle_count()
+        return self._stats.cycles
 
 
 class ClassesInCycle(ComputedMetric):
     """Number of classes that are in a dependency cycle."""
 
     def _compute(self) -> MetricValue:
-        return len({c for cycle in self._cfinder.cycles() for c in cycle.involved_classes})
+        return self._stats.classes_in_cycle
 
 
 class ClassesInCycleRatio(RatioMetric[ClassesInCycle, Classes]):
@@ -170,7 +191,7 @@ class MethodInstances(ComputedMetric):
     """Number of method instances."""
 
     def _compute(self) -> MetricValue:
-        return sum(1 for c in self._diag.classes() for _ in self._diag.methods(c))
+        return self._stats.methods
 
 
 class AvgMethodsPerClass(RatioMetric[MethodInstances, Classes]):
@@ -182,7 +203,7 @@ class RelationshipInstances(ComputedMetric):
     """Number of relationship instances."""
 
     def _compute(self) -> MetricValue:
-        return sum(1 for c in self._diag.classes() for _ in self._diag.relationships(c))
+        return self._stats.relationships
 
 
 class AvgRelationshipsPerClass(RatioMetric[RelationshipInstances, Classes]):
@@ -194,13 +215,12 @@ class AvgInheritanceDepth(ComputedMetric):
     """Average depth of inheritance trees."""
 
     def _compute(self) -> MetricValue:
-        leaf_classes = list(self._diag.leaf_classes(exclude_standalone=True))
-        n_classes = len(leaf_classes)
+        n_classes = self._stats.leaf_classes
 
         if n_classes == 0:
             return 0.0
 
-        return sum(self._diag.inheritance_depth(c) for c in leaf_classes) / n_classes
+        return self._stats.leaf_inheritance_depth / n_classes
 
 
 class RemediationCost(LinearCombinationMetric):
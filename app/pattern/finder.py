@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from typing import Dict, Iterator, List, Optional, Type
+from collections import defaultdict
+from typing import DefaultDict, Iterator, List, Optional, Set, Type
 
 from app.uml.model import Class, Diagram
+from app.util.decorators import cached_property
 from .matcher import Matcher
 from .model import Pattern
 
@@ -15,33 +17,48 @@ class PatternFinder:
     def __init__(self, diagram: Diagram, matcher: Matcher) -> None:
         self._diagram = diagram
         self._matcher = matcher
-        self._patterns: Dict[Class, List[Pattern]] = {}
+        self._patterns: DefaultDict[Class, List[Pattern]] = defaultdict(list)
+        self._patterns_by_type: DefaultDict[Type[Pattern], List[Pattern]] = defaultdict(list)
+        self._unique: List[Pattern] = []
+        self._computed = False
 
     def patterns(self, kind: Optional[Type[Pattern]] = None) -> Iterator[Pattern]:
         self._find_patterns()
-        returned = set()
 
-        for c in self._patterns.keys():
-            for p in self._patterns[c]:
-                if (not kind or isinstance(p, kind)) and p not in returned:
-                    returned.add(p)
-                    yield p
+        if kind:
+            for ptype, patterns in self._patterns_by_type.items():
+                if issubclass(ptype, kind):
+                    yield from patterns
+            return
+
+        yield from self._unique
+
+    @cached_property
+    def pattern_type_names(self) -> Set[str]:
+        return {p.name for p in self.patterns()}
+
+    @cached_property
+    def classes_in_patterns(self) -> Set[Class]:
+        self._find_patterns()
+        return set(self._patterns)
 
     # Private
 
     def _find_patterns(self) -> None:
-        if self._patterns:
+        if self._computed:
             return
 
         for c in self._diagram.classes():
             for p in self._matcher.match(self._diagram, c):
                 self._find_pattern(p)
 
-    def _find_pattern(self, p: Pattern) -> None:
-        for c in p.involved_classes:
-            patterns = self._patterns.get(c, [])
+        # Patterns are shared by all their involved classes: deduplicate by identity.
+        unique = {id(p): p for patterns in self._patterns.values() for p in patterns}
+        self._unique = list(unique.values())
+        self._computed = True
 
-            if not patterns:
-                self._patterns[c] = patterns
+    def _find_pattern(self, p: Pattern) -> None:
+        self._patterns_by_type[type(p)].append(p)
 
-            patterns.append(p)
+        for c in p.involved_classes:
+            self._patterns[c].append(p)
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
-import re
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from itertools import chain
-from typing import Dict, Iterable, List, Type
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Type
 
 from app.uml.model import AggType, Class, Diagram, Multiplicity, RelRole, Scope
 from .model import (
@@ -16,6 +16,7 @@ class Matcher(ABC):
     """Matcher abstract class."""
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def all() -> Dict[Type[Pattern], Type[Matcher]]:
         return {
             AbstractFactory: AbstractFactoryMatcher,
@@ -30,6 +31,11 @@ class Matcher(ABC):
             Singleton: SingletonMatcher
         }
 
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def by_name() -> Dict[str, Type[Matcher]]:
+        return {p.__name__.lower(): m for p, m in Matcher.all().items()}
+
     @abstractmethod
     def match(self, dg: Diagram, cls: Class) -> Iterable[Pattern]:
         pass
@@ -119,7 +125,7 @@ class BridgeMatcher(Matcher):
         # Find concrete implementors
         concr = list(chain(dg.sub_classes(impl), dg.realizations(impl)))
 
-        if _all_unique(cls, impl, *r_abs, *concr):
+        if _all_unique_iter((cls, impl), r_abs, concr):
             yield Bridge(cls, impl, r_abs, concr)
 
 
@@ -144,7 +150,10 @@ class CompositeMatcher(Matcher):
 
         # Filter leaves
         leaves = [leaf for leaf in leaves if leaf not in composites]
-        yield from (Composite(c, cls, leaves) for c in composites if _all_unique(c, cls, *leaves))
+
+        for c in composites:
+            if _all_unique_iter((c, cls), leaves):
+                yield Composite(c, cls, leaves)
 
 
 class DecoratorMatcher(Matcher):
@@ -172,7 +181,7 @@ class DecoratorMatcher(Matcher):
         for d in decorators:
             cd = list(dg.sub_classes(d))
 
-            if _all_unique(d, cls, *cc, *cd):
+            if _all_unique_iter((d, cls), cc, cd):
                 yield Decorator(d, cls, cc, cd)
 
 
@@ -189,12 +198,33 @@ class FacadeMatcher(Matcher):
 class FactoryMethodMatcher(Matcher):
     """Factory method matcher."""
 
-    _regex = re.compile(r'^(?:alloc|build|construct|create|instantiate|new)', re.I)
+    _prefixes = ('alloc', 'build', 'construct', 'create', 'instantiate', 'new')
+    # Only the part of the name that can match a prefix needs lowercasing.
+    _prefix_len = max(map(len, _prefixes))
+
+    def __init__(self) -> None:
+        # Matches are cached as they are shared with the abstract factory matcher.
+        self._diagram: Optional[Diagram] = None
+        self._matches: Dict[Class, List[FactoryMethod]] = {}
 
     def match(self, dg: Diagram, cls: Class) -> Iterable[FactoryMethod]:
+        if dg is not self._diagram:
+            self._diagram = dg
+            self._matches = {}
+
+        matches = self._matches.get(cls)
+
+        if matches is None:
+            matches = list(self._match(dg, cls))
+            self._matches[cls] = matches
+
+        return matches
+
+    def _match(self, dg: Diagram, cls: Class) -> Iterator[FactoryMethod]:
         # Find factory methods
         methods = (m for m in dg.methods(cls)
-                   if isinstance(m.return_type, Class) and self._regex.match(m.name))
+                   if (isinstance(m.return_type, Class) and
+                       m.name[:self._prefix_len].lower().startswith(self._prefixes)))
 
         created = list(dg.dependencies(cls, match=(lambda r:
                                                    (r.is_creational and
@@ -274,5 +304,15 @@ class SingletonMatcher(Matcher):
 
 
 def _all_unique(*args) -> bool:
+    return len(args) == len(set(args))
+
+
+def _all_unique_iter(*sequences: Sequence) -> bool:
     seen = set()
-    return not any(i in seen or seen.add(i) for i in args)
+    count = 0
+
+    for seq in sequences:
+        seen.update(seq)
+        count += len(seq)
+
+    return count == len(seen)
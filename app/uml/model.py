@@ -1,79 +1,113 @@
+import sys
+from collections import defaultdict
 from enum import Enum, Flag, auto, unique
 from itertools import chain
-from typing import Any, Callable, Dict, Iterator, List, Optional, Set, cast
+from operator import attrgetter
+from typing import (
+    Any, Callable, Collection, DefaultDict, Dict, Iterator, List, Optional, Sequence, Set, Tuple,
+    cast
+)
+
+from app.util import graph
 
 
 class Element:
     """Models generic elements of the class diagram."""
 
+    __slots__ = ('identifier', 'name', '_hash')
+
     def __init__(self, identifier: str, name: str) -> None:
         if not (identifier and name):
             raise ValueError('Invalid falsy value.')
 
-        self.identifier = identifier
+        self.identifier = sys.intern(identifier)
         self.name = name
+        self._hash = hash(identifier)
 
     def __repr__(self) -> str:
         return self.name
 
     def __eq__(self, other) -> bool:
-        try:
-            return self.identifier == other.identifier
-        except AttributeError:
+        if self is other:
+            return True
+        if not isinstance(other, Element):
             return NotImplemented
+        return self.identifier == other.identifier
 
     def __lt__(self, other) -> bool:
-        try:
-            return self.name < other.name
-        except AttributeError:
+        if not isinstance(other, Element):
             return NotImplemented
+        return self.name < other.name
 
     def __hash__(self):
-        return self.identifier.__hash__()
+        return self._hash
 
 
 class Stereotype(Element):
     """Models stereotypes."""
 
+    __slots__ = ()
     _creational_names = {'create', 'instantiate'}
 
     def is_creational(self) -> bool:
         return self.name in self._creational_names
 
+    def is_interface(self) -> bool:
+        return self.name == 'Interface'
+
     def __repr__(self) -> str:
-        return '<<{}>>'.format(self.name)
+        return f'<<{self.name}>>'
 
 
 class StereotypedElement(Element):
     """Models elements with stereotypes."""
 
+    __slots__ = ('stereotypes', '_flags', '_stereotypes_repr')
+
+    # Stereotype flags
+    _INTERFACE = 1
+    _CREATIONAL = 2
+
     def __init__(self, identifier: str, name: str) -> None:
         super().__init__(identifier=identifier, name=name)
         self.stereotypes: List[Stereotype] = []
+        self._flags = 0
+        self._stereotypes_repr = ''
 
-    def __repr__(self) -> str:
-        if self.stereotypes:
-            stereotypes = ' <<{}>>'.format(', '.join(s.name for s in self.stereotypes))
-        else:
-            stereotypes = ''
+    def add_stereotype(self, stereotype: Stereotype) -> None:
+        self.stereotypes.append(stereotype)
+        self._stereotypes_repr = f" <<{', '.join(s.name for s in self.stereotypes)}>>"
 
-        return self.name + stereotypes
+        if stereotype.is_interface():
+            self._flags |= self._INTERFACE
+
+        if stereotype.is_creational():
+            self._flags |= self._CREATIONAL
+
+    def __repr__(self) -> str:
+        return self.name + self._stereotypes_repr
 
 
 class Datatype(StereotypedElement):
     """Models datatypes."""
-    pass
+    __slots__ = ()
 
 
 class TypedElement(Element):
     """Models elements which have a datatype."""
 
+    __slots__ = ('datatype',)
+
     def __init__(self, identifier: str, name: str, datatype: Datatype) -> None:
         super().__init__(identifier=identifier, name=name)
         self.datatype = datatype
 
+    @property
+    def datatype_identifier(self) -> Optional[str]:
+        return self.datatype.identifier if self.datatype else None
+
     def __repr__(self) -> str:
-        return '{}: {}'.format(self.name, self.datatype.name) if self.datatype else self.name
+        return f'{self.name}: {self.datatype.name}' if self.datatype else self.name
 
 
 @unique
@@ -86,27 +120,39 @@ class Scope(Enum):
 class Parameter(TypedElement):
     """Models function parameters."""
 
+    __slots__ = ()
+
+    @property
+    def signature(self) -> Tuple:
+        return self.name, self.datatype_identifier
+
     def equals(self, other: 'Parameter') -> bool:
-        return self.name == other.name and self.datatype == other.datatype
+        return self.signature == other.signature
 
 
 class Attribute(TypedElement):
     """Models class attributes."""
 
+    __slots__ = ('scope',)
+
     def __init__(self, identifier: str, name: str, datatype: Datatype,
                  scope: Scope = Scope.INSTANCE) -> None:
         super().__init__(identifier=identifier, name=name, datatype=datatype)
         self.scope = scope
 
+    @property
+    def signature(self) -> Tuple:
+        return self.name, self.scope, self.datatype_identifier
+
     def equals(self, other: 'Attribute') -> bool:
-        return (self.name == other.name and
-                self.scope == other.scope and
-                self.datatype == other.datatype)
+        return self.signature == other.signature
 
 
 class Method(Element):
     """Models methods."""
 
+    __slots__ = ('scope', 'abstract', 'parameters', 'return_type')
+
     def __init__(self, identifier: str, name: str,
                  scope: Scope = Scope.INSTANCE,
                  abstract: bool = False,
@@ -119,35 +165,44 @@ class Method(Element):
         self.return_type: Optional[Datatype] = return_type
 
     def __repr__(self) -> str:
-        args = ', '.join(repr(a) for a in self.parameters)
+        args = ', '.join(map(repr, self.parameters))
         ret_type = self.return_type.name if self.return_type else 'void'
-        return '{}({}): {}'.format(self.name, args, ret_type)
+        return f'{self.name}({args}): {ret_type}'
+
+    @property
+    def signature(self) -> Tuple:
+        ret_type = self.return_type.identifier if self.return_type else None
+        return self.name, self.scope, ret_type, tuple(p.signature for p in self.parameters)
 
     def equals(self, other: 'Method') -> bool:
-        return (self.name == other.name and
-                self.scope == other.scope and
-                self.return_type == other.return_type and
-                all(m1.equals(m2) for (m1, m2) in zip(self.parameters, other.parameters)))
+        return self.signature == other.signature
 
 
 class Package(Element):
     """Models package."""
-    pass
+    __slots__ = ()
 
 
 class Class(Datatype):
     """Models classes."""
 
+    __slots__ = ('abstract', 'package', 'attributes', 'methods', '_qualified_name')
+
     @property
     def is_interface(self) -> bool:
-        return any(s.name == 'Interface' for s in self.stereotypes)
+        return bool(self._flags & self._INTERFACE)
 
     @property
     def qualified_name(self) -> str:
-        name = self.name
+        name = self._qualified_name
 
-        if self.package:
-            name = '{}.{}'.format(self.package.name, name)
+        if name is None:
+            name = self.name
+
+            if self.package:
+                name = f'{self.package.name}.{name}'
+
+            self._qualified_name = name
 
         return name
 
@@ -158,17 +213,17 @@ class Class(Datatype):
         self.package = package
         self.attributes: List[Attribute] = []
         self.methods: List[Method] = []
+        self._qualified_name: Optional[str] = None
 
     def __repr__(self) -> str:
         name = super().__repr__()
 
         if self.package:
-            name = '{}.{}'.format(self.package.name, name)
+            name = f'{self.package.name}.{name}'
 
-        am_str = '\n'.join(['  {}'.format(a) for a in self.attributes] +
-                           ['  {}'.format(m) for m in self.methods])
+        am_str = '\n'.join(f'  {e!r}' for e in chain(self.attributes, self.methods))
 
-        return '{} {{\n{}\n}}'.format(name, am_str) if am_str else name + ' {}'
+        return f'{name} {{\n{am_str}\n}}' if am_str else name + ' {}'
 
     def __str__(self) -> str:
         return self.qualified_name
@@ -186,7 +241,14 @@ class RelType(Flag):
     NON_HIERARCHICAL = ASSOCIATION | DEPENDENCY
 
     def to_string(self) -> str:
-        return self.name.lower().capitalize()
+        return _REL_TYPE_STRINGS[self]
+
+
+_REL_TYPE_STRINGS = {t: t.name.lower().capitalize() for t in RelType.__members__.values()}
+
+
+_ATOMIC_REL_TYPES = frozenset((RelType.ASSOCIATION, RelType.DEPENDENCY,
+                               RelType.GENERALIZATION, RelType.REALIZATION))
 
 
 class AggType(Flag):
@@ -197,6 +259,9 @@ class AggType(Flag):
     ANY = SHARED | COMPOSITED
 
 
+_AGG_NAMES = {AggType.SHARED: 'Aggregation', AggType.COMPOSITED: 'Composition'}
+
+
 class RelRole(Flag):
     """Models relationship roles."""
     LHS = auto()
@@ -205,11 +270,10 @@ class RelRole(Flag):
 
     @property
     def opposite(self) -> 'RelRole':
-        if self == self.LHS:
-            return self.RHS
-        elif self == self.RHS:
-            return self.LHS
-        return self.ANY
+        return _OPPOSITE_ROLES.get(self, self.ANY)
+
+
+_OPPOSITE_ROLES = {RelRole.LHS: RelRole.RHS, RelRole.RHS: RelRole.LHS}
 
 
 class Multiplicity(Flag):
@@ -225,25 +289,30 @@ class Multiplicity(Flag):
     ANY = AT_MOST_ONE | MULTIPLE
 
     def to_string(self) -> str:
-        if self == Multiplicity.ZERO:
-            return '0'
-        elif self == Multiplicity.ONE:
-            return '1'
-        elif self == Multiplicity.N:
-            return 'N'
-        elif self == Multiplicity.STAR:
-            return '0..*'
-        elif self == Multiplicity.PLUS:
-            return '1..*'
+        return _MULT_STRINGS.get(self)
+
+
+_MULT_STRINGS = {
+    Multiplicity.ZERO: '0',
+    Multiplicity.ONE: '1',
+    Multiplicity.N: 'N',
+    Multiplicity.STAR: '0..*',
+    Multiplicity.PLUS: '1..*',
+}
+
+
+def _mult_to_str(mult: Multiplicity) -> str:
+    return '' if mult == Multiplicity.ONE else f' ({mult.to_string()})'
 
 
 class Relationship(StereotypedElement):
     """Models class relationships."""
 
+    __slots__ = ('rel_type', 'from_cls', 'to_cls', '_repr')
+
     @property
     def is_creational(self) -> bool:
-        return (self.rel_type == RelType.DEPENDENCY and
-                any(s.is_creational for s in self.stereotypes))
+        return self.rel_type == RelType.DEPENDENCY and bool(self._flags & self._CREATIONAL)
 
     def __init__(self, identifier: str, rel_type: RelType,
                  from_cls: Class, to_cls: Class) -> None:
@@ -251,15 +320,27 @@ class Relationship(StereotypedElement):
         self.rel_type = rel_type
         self.from_cls = from_cls
         self.to_cls = to_cls
+        self._repr: Optional[str] = None
+
+    def add_stereotype(self, stereotype: Stereotype) -> None:
+        super().add_stereotype(stereotype)
+        self._repr = None
 
     def __repr__(self) -> str:
+        if self._repr is None:
+            self._repr = self._build_repr()
+        return self._repr
+
+    def _build_repr(self) -> str:
         name = StereotypedElement.__repr__(self)
-        return '{}({}, {})'.format(name, self.from_cls.name, self.to_cls.name)
+        return f'{name}({self.from_cls.name}, {self.to_cls.name})'
 
 
 class Association(Relationship):
     """Models class associations."""
 
+    __slots__ = ('aggregation_type', 'from_mult', 'to_mult')
+
     def __init__(self, identifier: str, agg_type: AggType,
                  from_cls: Class, to_cls: Class, from_mult: Multiplicity = Multiplicity.ONE,
                  to_mult: Multiplicity = Multiplicity.ONE) -> None:
@@ -268,20 +349,34 @@ class Association(Relationship):
         self.aggregation_type = agg_type
         self.from_mult = from_mult
         self.to_mult = to_mult
+        self.name = _AGG_NAMES.get(agg_type, self.name)
 
-        if agg_type == AggType.SHARED:
-            self.name = 'Aggregation'
-        elif agg_type == AggType.COMPOSITED:
-            self.name = 'Composition'
-
-    def __repr__(self) -> str:
+    def _build_repr(self) -> str:
         name = StereotypedElement.__repr__(self)
+        return (f'{name}({self.from_cls.name}{_mult_to_str(self.from_mult)}, '
+                f'{self.to_cls.name}{_mult_to_str(self.to_mult)})')
+
 
-        def _mult_to_str(mult: Multiplicity) -> str:
-            return '' if mult == Multiplicity.ONE else ' ({})'.format(mult.to_string())
+_from_cls = attrgetter('from_cls')
+_to_cls = attrgetter('to_cls')
 
-        return '{}({}{}, {}{})'.format(name, self.from_cls.name, _mult_to_str(self.from_mult),
-                                       self.to_cls.name, _mult_to_str(self.to_mult))
+# Kinds that support typed lookups, classes are also found as datatypes.
+_INDEXED_KINDS = (Class, Datatype, Package, Stereotype, Relationship)
+
+
+class _RelationshipIndex:
+    """Relationships of a single type and their related classes, by role."""
+
+    __slots__ = ('lhs', 'rhs', 'lhs_related', 'rhs_related', 'lhs_members')
+
+    def __init__(self) -> None:
+        self.lhs: DefaultDict[Class, List[Relationship]] = defaultdict(list)
+        self.rhs: DefaultDict[Class, List[Relationship]] = defaultdict(list)
+        # Related classes are listed once per relationship, like related_classes() yields them.
+        self.lhs_related: DefaultDict[Class, List[Class]] = defaultdict(list)
+        self.rhs_related: DefaultDict[Class, List[Class]] = defaultdict(list)
+        # Same classes as lhs_related, for constant time membership tests.
+        self.lhs_members: DefaultDict[Class, Set[Class]] = defaultdict(set)
 
 
 class Diagram:
@@ -293,8 +388,19 @@ class Diagram:
     # Public
 
     def __init__(self) -> None:
-        self._elements: Dict[str, Element] = {}
-        self._relationships: Dict[Element, Set[Relationship]] = {}
+        self._by_kind: Dict[type, Dict[str, Any]] = {kind: {} for kind in _INDEXED_KINDS}
+        self._classes: Dict[str, Class] = self._by_kind[Class]
+        self._packages: Dict[str, Package] = self._by_kind[Package]
+        self._stereotypes: Dict[str, Stereotype] = self._by_kind[Stereotype]
+        self._relationship_elements: Dict[str, Relationship] = self._by_kind[Relationship]
+        self._datatypes: Dict[str, Element] = {}
+        self._relationships: DefaultDict[Element, List[Relationship]] = defaultdict(list)
+        self._relationships_from: DefaultDict[Class, List[Relationship]] = defaultdict(list)
+        self._relationships_to: DefaultDict[Class, List[Relationship]] = defaultdict(list)
+        self._relationships_by_type: Dict[RelType, _RelationshipIndex] = {
+            t: _RelationshipIndex() for t in _ATOMIC_REL_TYPES
+        }
+        self._inheritance_depths: Dict[Class, int] = {}
 
     def package(self, identifier: str) -> Package:
         return self._get_typed_element(Package, identifier)
@@ -311,31 +417,44 @@ class Diagram:
     def relationship(self, identifier: str) -> Relationship:
         return self._get_typed_element(Relationship, identifier)
 
+    def find(self, kind: type, identifier: Optional[str]) -> Any:
+        elements = self._by_kind.get(kind)
+        return elements.get(identifier) if elements else None
+
     def classes(self, exclude_interfaces: bool = False) -> Iterator[Class]:
-        return (c for c in self._elements.values()
-                if isinstance(c, Class) and not (exclude_interfaces and c.is_interface))
+        if exclude_interfaces:
+            return iter([c for c in self._classes.values() if not c.is_interface])
+        return iter(self._classes.values())
 
     def packages(self) -> Iterator[Package]:
-        return (p for p in self._elements.values() if isinstance(p, Package))
+        return iter(self._packages.values())
 
     def relationships(self, cls: Class,
                       kind: Optional[RelType] = None,
                       role: RelRole = RelRole.ANY,
                       match: RelationshipMatch = None) -> Iterator[Relationship]:
-        rel = self._relationships.get(cls, [])
+        index = self._relationships_by_type.get(kind)
+
+        if index is not None and role is not RelRole.ANY:
+            rel = (index.lhs if role is RelRole.LHS else index.rhs).get(cls, ())
+            return iter([r for r in rel if match(r)] if match else rel)
 
-        if kind:
-            rel = (r for r in rel if r.rel_type in kind)
+        if role is RelRole.LHS:
+            rel = self._relationships_from.get(cls, ())
+        elif role is RelRole.RHS:
+            rel = self._relationships_to.get(cls, ())
+        else:
+            rel = self._relationships.get(cls, ())
 
-        if role == RelRole.LHS:
-            rel = (r for r in rel if r.from_cls == cls)
-        elif role == RelRole.RHS:
-            rel = (r for r in rel if r.to_cls == cls)
+        if kind and kind is not RelType.ANY:
+            # Raw bit test, Flag.__contains__ and Enum.value are Python-level calls.
+            mask = kind._value_
+            rel = [r for r in rel if r.rel_type._value_ & mask]
 
         if match:
-            rel = (r for r in rel if match(r))
+            rel = [r for r in rel if match(r)]
 
-        return rel
+        return iter(rel)
 
     def associations(self, cls: Class, role: RelRole = RelRole.RHS,
                      match: AssociationMatch = None) -> Iterator[Association]:
@@ -343,7 +462,7 @@ class Diagram:
         assoc = cast(Iterator[Association], assoc)
 
         if match:
-            assoc = (a for a in assoc if match(a))
+            assoc = iter([a for a in assoc if match(a)])
 
         return assoc
 
@@ -351,21 +470,18 @@ class Diagram:
                         kind: Optional[RelType] = None,
                         role: RelRole = RelRole.LHS,
                         match: RelationshipMatch = None) -> Iterator[Class]:
-        return (r.to_cls if r.from_cls == cls else r.from_cls
-                for r in self.relationships(cls, kind=kind, role=role, match=match))
+        return self._opposite_classes(cls, role,
+                                      self.relationships(cls, kind=kind, role=role, match=match))
 
     def associated_classes(self, cls: Class, role: RelRole = RelRole.LHS,
                            match: AssociationMatch = None) -> Iterator[Class]:
-        return (r.to_cls if r.from_cls == cls else r.from_cls
-                for r in self.associations(cls, role=role, match=match))
+        return self._opposite_classes(cls, role, self.associations(cls, role=role, match=match))
 
     def sub_classes(self, cls: Class, match: RelationshipMatch = None) -> Iterator[Class]:
-        return self.related_classes(cls, kind=RelType.GENERALIZATION,
-                                    role=RelRole.LHS, match=match)
+        return self._indexed_related_classes(cls, RelType.GENERALIZATION, RelRole.LHS, match)
 
     def super_classes(self, cls: Class, match: RelationshipMatch = None) -> Iterator[Class]:
-        return self.related_classes(cls, kind=RelType.GENERALIZATION,
-                                    role=RelRole.RHS, match=match)
+        return self._indexed_related_classes(cls, RelType.GENERALIZATION, RelRole.RHS, match)
 
     def leaf_classes(self, exclude_standalone: bool = False) -> Iterator[Class]:
         for c in self.classes(exclude_interfaces=True):
@@ -374,35 +490,40 @@ class Diagram:
                     yield c
 
     def ancestors(self, cls: Class, match: RelationshipMatch = None) -> Iterator[Class]:
-        for c in self.super_classes(cls, match):
-            yield c
-            yield from self.ancestors(c, match)
+        visited = {cls}
+        stack = [self.super_classes(cls, match)]
+
+        while stack:
+            c = next(stack[-1], None)
+
+            if c is None:
+                stack.pop()
+            elif c not in visited:
+                visited.add(c)
+                yield c
+                stack.append(self.super_classes(c, match))
 
     def realizations(self, cls: Class, match: RelationshipMatch = None) -> Iterator[Class]:
         if not cls.is_interface:
-            return
+            return iter(())
 
-        yield from self.related_classes(cls, kind=RelType.REALIZATION,
-                                        role=RelRole.LHS, match=match)
+        return self._indexed_related_classes(cls, RelType.REALIZATION, RelRole.LHS, match)
 
     def interfaces(self, cls: Class, match: RelationshipMatch = None) -> Iterator[Class]:
-        return self.related_classes(cls, kind=RelType.REALIZATION,
-                                    role=RelRole.RHS, match=match)
+        return self._indexed_related_classes(cls, RelType.REALIZATION, RelRole.RHS, match)
 
     def dependencies(self, cls: Class, match: RelationshipMatch = None) -> Iterator[Class]:
-        return self.related_classes(cls, kind=RelType.DEPENDENCY,
-                                    role=RelRole.LHS, match=match)
+        return self._indexed_related_classes(cls, RelType.DEPENDENCY, RelRole.LHS, match)
 
     def dependants(self, cls: Class, match: RelationshipMatch = None) -> Iterator[Class]:
-        return self.related_classes(cls, kind=RelType.DEPENDENCY,
-                                    role=RelRole.RHS, match=match)
+        return self._indexed_related_classes(cls, RelType.DEPENDENCY, RelRole.RHS, match)
 
     def is_sub_class(self, sub_cls: Class, super_cls: Class) -> bool:
-        return any(c for c in self.sub_classes(super_cls) if c == sub_cls)
+        return sub_cls in self._related_members(super_cls, RelType.GENERALIZATION)
 
     def is_realization(self, realization: Class, interface: Class) -> bool:
         return (interface.is_interface and
-                any(c for c in self.realizations(interface) if c == realization))
+                realization in self._related_members(interface, RelType.REALIZATION))
 
     def has_sub_classes(self, cls: Class) -> bool:
         return any(self.sub_classes(cls))
@@ -414,12 +535,16 @@ class Diagram:
         return any(self.realizations(cls))
 
     def inheritance_depth(self, cls: Class, start_depth: int = 0) -> int:
-        depth = start_depth
+        depths = self._updated_inheritance_depths()
+        depth = depths.get(cls)
+
+        if depth is None:
+            depth = max((depths.get(c, 0) + 1 for c in self.super_classes(cls)), default=0)
 
-        for c in self.super_classes(cls):
-            depth = max(self.inheritance_depth(c, start_depth=start_depth + 1), depth)
+        return start_depth + depth
 
-        return depth
+    def all_inheritance_depths(self) -> Dict[Class, int]:
+        return dict(self._updated_inheritance_depths())
 
     def methods(self, cls: Class) -> Iterator[Method]:
         yield from cls.methods
@@ -428,54 +553,113 @@ class Diagram:
             yield from self.methods(c)
 
     def add_element(self, element: Element) -> None:
-        self._elements[element.identifier] = element
+        identifier = element.identifier
+        by_kind = self._by_kind
+
+        for kind in _INDEXED_KINDS:
+            if isinstance(element, kind):
+                by_kind[kind][identifier] = element
+
+        if not isinstance(element, (Class, Stereotype, Package, Relationship)):
+            self._datatypes[identifier] = element
 
     def add_relationship(self, relationship: Relationship) -> None:
+        # Relationships are deduplicated by identifier, the indexes are plain lists.
+        is_new = relationship.identifier not in self._relationship_elements
         self.add_element(relationship)
 
-        for key in (relationship.from_cls, relationship.to_cls):
-            relationships = self._relationships.get(key, set())
+        if not is_new:
+            return
+
+        rel_type = relationship.rel_type
+        from_cls, to_cls = relationship.from_cls, relationship.to_cls
+
+        if rel_type == RelType.GENERALIZATION:
+            self._inheritance_depths.clear()
+
+        self._relationships[from_cls].append(relationship)
 
-            if not relationships:
-                self._relationships[key] = relationships
+        if to_cls != from_cls:
+            self._relationships[to_cls].append(relationship)
 
-            relationships.add(relationship)
+        self._relationships_from[from_cls].append(relationship)
+        self._relationships_to[to_cls].append(relationship)
+
+        index = self._relationships_by_type[rel_type]
+        index.lhs[from_cls].append(relationship)
+        index.rhs[to_cls].append(relationship)
+        index.lhs_related[from_cls].append(to_cls)
+        index.lhs_members[from_cls].add(to_cls)
+        index.rhs_related[to_cls].append(from_cls)
 
     def __repr__(self) -> str:
-        pk, dt, cl, st, rel = [], [], [], [], []
-
-        for e in self._elements.values():
-            if isinstance(e, Class):
-                cl.append(repr(e))
-            elif isinstance(e, Stereotype):
-                st.append(repr(e))
-            elif isinstance(e, Package):
-                pk.append(repr(e))
-            elif isinstance(e, Relationship):
-                rel.append(repr(e))
-            else:
-                dt.append(repr(e))
-
-        pk.sort()
-        dt.sort()
-        cl.sort()
-        st.sort()
-        rel.sort()
-
-        pk = 'Packages:\n---------\n' + '\n'.join(pk)
-        dt = 'Datatypes:\n----------\n' + '\n'.join(dt)
-        cl = 'Classes:\n--------\n' + '\n'.join(cl)
-        st = 'Stereotypes:\n------------\n' + '\n'.join(st)
-        rel = 'Relationships:\n--------------\n' + '\n'.join(rel)
-
-        return '\n\n'.join([pk, dt, st, cl, rel])
+        sections = (('Packages', self._packages),
+                    ('Datatypes', self._datatypes),
+                    ('Stereotypes', self._stereotypes),
+                    ('Classes', self._classes),
+                    ('Relationships', self._relationship_elements))
+
+        parts = []
+
+        for title, elements in sections:
+            lines = '\n'.join(sorted(map(repr, elements.values())))
+            parts.append(f"{title}:\n{'-' * (len(title) + 1)}\n{lines}")
+
+        return '\n\n'.join(parts)
 
     # Private
 
-    def _get_typed_element(self, kind: type, identifier: str) -> Any:
-        el = self._elements.get(identifier, None)
+    def _updated_inheritance_depths(self) -> Dict[Class, int]:
+        depths = self._inheritance_depths
+
+        if len(depths) == len(self._classes):
+            return depths
+
+        # Generalization cycles are condensed into strongly connected components, whose classes
+        # share the same depth. Tarjan emits a component after all the ones it can reach,
+        # so super classes are always resolved first.
+        super_classes = self._relationships_by_type[RelType.GENERALIZATION].rhs_related
+        classes = list(self._classes.values())
+        index = {c: i for i, c in enumerate(classes)}
+        adj = [[index[s] for s in super_classes.get(c, ()) if s in index] for c in classes]
+
+        depths.clear()
+
+        for component in graph.strongly_connected_components(adj):
+            members = set(component)
+            depth = max((depths[classes[s]] + 1
+                         for c in component for s in adj[c] if s not in members), default=0)
+            depths.update((classes[c], depth) for c in component)
+
+        return depths
+
+    @staticmethod
+    def _opposite_classes(cls: Class, role: RelRole,
+                          rel: Iterator[Relationship]) -> Iterator[Class]:
+        # With a fixed role the opposite end is known upfront.
+        if role is RelRole.LHS:
+            return map(_to_cls, rel)
+        if role is RelRole.RHS:
+            return map(_from_cls, rel)
+        return (r.to_cls if r.from_cls == cls else r.from_cls for r in rel)
+
+    def _indexed_related_classes(self, cls: Class, kind: RelType, role: RelRole,
+                                 match: RelationshipMatch = None) -> Iterator[Class]:
+        if match:
+            return self.related_classes(cls, kind=kind, role=role, match=match)
+        return iter(self._related_list(cls, kind, role))
+
+    def _related_list(self, cls: Class, kind: RelType, role: RelRole) -> Sequence[Class]:
+        # Same content as related_classes(cls, kind, role), one entry per relationship.
+        index = self._relationships_by_type[kind]
+        return (index.lhs_related if role is RelRole.LHS else index.rhs_related).get(cls, ())
 
-        if not (el and isinstance(el, kind)):
-            raise KeyError('No such {}: {}'.format(str(kind), identifier))
+    def _related_members(self, cls: Class, kind: RelType) -> Collection[Class]:
+        # Same classes as _related_list(cls, kind, RelRole.LHS), as a set.
+        return self._relationships_by_type[kind].lhs_members.get(cls, ())
 
-        return el
+    def _get_typed_element(self, kind: type, identifier: str) -> Any:
+        try:
+            return self._by_kind[kind][identifier]
+        except KeyError:
+            raise KeyError('No such {}: {}'.format(str(kind), identifier)) from None
@@ -1,5 +1,12 @@
-import xml.etree.ElementTree as Et
-from typing import Optional
+import sys
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    from lxml import etree as Et
+    HAS_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as Et
+    HAS_LXML = False
 
 from . import model as cd
 
@@ -47,6 +54,183 @@ class XA:
     TO = 'To'
 
 
+Query = Callable[[Et.Element], List[Et.Element]]
+
+
+def _query(path: str) -> Query:
+    if HAS_LXML:
+        return Et.XPath(path)
+    return lambda node: node.findall(path)
+
+
+def _descendants(*tags: str) -> Query:
+    if HAS_LXML:
+        return Et.XPath('|'.join('.//' + tag for tag in tags))
+    tags = frozenset(tags)
+    return lambda node: [n for n in node.iter() if n.tag in tags and n is not node]
+
+
+def _first(query: Query, node: Et.Element) -> Optional[Et.Element]:
+    matches = query(node)
+    return matches[0] if matches else None
+
+
+class XQ:
+    """Compiled XML queries namespace."""
+    FROM_END = _query(XT.path(XT.FROM_END, XT.ASSOCIATION_END))
+    MODEL_CHILDREN = _query(XT.path(XT.MODEL_CHILDREN))
+    PARAMETERS = _descendants(XT.PARAMETER)
+    RET_TYPE = _query(XT.path(XT.RET_TYPE))
+    STEREOTYPE_REFS = _query(XT.path(XT.STEREOTYPES, XT.STEREOTYPE))
+    TO_END = _query(XT.path(XT.TO_END, XT.ASSOCIATION_END))
+    TYPE = _query(XT.path(XT.TYPE))
+
+
+# Tags of the nodes defining diagram elements.
+_DEFINITION_TAGS = (XT.ASSOCIATION, XT.CLASS, XT.DATATYPE, XT.DEPENDENCY, XT.GENERALIZATION,
+                    XT.PACKAGE, XT.REALIZATION, XT.STEREOTYPE, XT.USAGE)
+# Elements which are only defined as children of the models node (classes also within packages).
+_TOP_LEVEL_TAGS = frozenset((XT.CLASS, XT.DATATYPE, XT.PACKAGE, XT.STEREOTYPE))
+_RELATIONSHIP_TAGS = frozenset((XT.DEPENDENCY, XT.GENERALIZATION, XT.REALIZATION, XT.USAGE))
+
+_MULTIPLICITIES = {
+    '0': cd.Multiplicity.ZERO,
+    '1': cd.Multiplicity.ONE,
+    'Unspecified': cd.Multiplicity.ONE,
+    '*': cd.Multiplicity.STAR,
+    '0..*': cd.Multiplicity.STAR,
+    '+': cd.Multiplicity.PLUS,
+    '1..*': cd.Multiplicity.PLUS,
+}
+
+_REL_TYPES = {
+    XT.ASSOCIATION: cd.RelType.ASSOCIATION,
+    XT.DEPENDENCY: cd.RelType.DEPENDENCY,
+    XT.GENERALIZATION: cd.RelType.GENERALIZATION,
+    XT.REALIZATION: cd.RelType.REALIZATION,
+    XT.USAGE: cd.RelType.DEPENDENCY,
+}
+
+_AGG_TYPES = dict(cd.AggType.__members__)
+
+
+class _RelationshipRef(NamedTuple):
+    """Relationship whose endpoints are resolved once the whole document has been read."""
+    identifier: str
+    rel_type: cd.RelType
+    agg_type: Optional[cd.AggType]
+    from_id: Optional[str]
+    to_id: Optional[str]
+    from_mult: Optional[cd.Multiplicity] = None
+    to_mult: Optional[cd.Multiplicity] = None
+    stereotypes: Tuple[str, ...] = ()
+
+
+def _definitions(file_path: str) -> Iterator[Tuple[Et.Element, Optional[Et.Element]]]:
+    """Streams the nodes defining diagram elements, along with their package node (if any)."""
+    # Nodes are released once the caller resumes the iteration.
+    if HAS_LXML:
+        return _lxml_definitions(file_path)
+    return _et_definitions(file_path)
+
+
+def _lxml_definitions(file_path: str) -> Iterator[Tuple[Et.Element, Optional[Et.Element]]]:
+    for _, node in Et.iterparse(file_path, events=('end',), tag=_DEFINITION_TAGS + (XT.MODELS,),
+                                remove_blank_text=True, collect_ids=False):
+        parent = node.getparent()
+        package = None
+
+        if parent is None:
+            continue
+
+        if node.tag == XT.MODELS:
+            # Only the first models node below the root is read.
+            if parent.getparent() is None:
+                return
+            continue
+
+        if node.tag in _TOP_LEVEL_TAGS:
+            if not _is_models(parent):
+                package = parent.getparent()
+
+                if not (node.tag == XT.CLASS and parent.tag == XT.MODEL_CHILDREN and
+                        package is not None and package.tag == XT.PACKAGE and
+                        _is_models(package.getparent())):
+                    continue
+
+            drop_siblings = True
+        else:
+            if not _in_models(parent):
+                continue
+
+            drop_siblings = _tag(parent.getparent()) == XT.MODEL_RELATIONSHIP_CONTAINER
+
+        yield node, package
+
+        node.clear()
+
+        # Preceding siblings have been handled as well, unless they belong to a pending class.
+        if drop_siblings:
+            while node.getprevious() is not None:
+                del parent[0]
+
+
+def _et_definitions(file_path: str) -> Iterator[Tuple[Et.Element, Optional[Et.Element]]]:
+    # ElementTree nodes do not know their parent: keep track of the open ones.
+    ancestors: List[Et.Element] = []
+    tags = frozenset(_DEFINITION_TAGS)
+
+    for event, node in Et.iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            ancestors.append(node)
+            continue
+
+        ancestors.pop()
+        depth = len(ancestors)
+
+        if depth == 1 and node.tag == XT.MODELS:
+            return
+
+        if node.tag not in tags or depth < 2 or ancestors[1].tag != XT.MODELS:
+            continue
+
+        package = None
+
+        if node.tag in _TOP_LEVEL_TAGS and depth != 2:
+            package = ancestors[2]
+
+            if not (node.tag == XT.CLASS and depth == 4 and package.tag == XT.PACKAGE and
+                    ancestors[3].tag == XT.MODEL_CHILDREN):
+                continue
+
+        yield node, package
+        node.clear()
+
+
+def _id_ref(node: Et.Element) -> Optional[str]:
+    return node.get(XA.ID_REF)
+
+
+def _tag(node: Optional[Et.Element]) -> Optional[str]:
+    return None if node is None else node.tag
+
+
+def _is_models(node: Optional[Et.Element]) -> bool:
+    # The models node is a child of the document root.
+    if node is None or node.tag != XT.MODELS:
+        return False
+    parent = node.getparent()
+    return parent is not None and parent.getparent() is None
+
+
+def _in_models(node: Optional[Et.Element]) -> bool:
+    while node is not None:
+        if _is_models(node):
+            return True
+        node = node.getparent()
+    return False
+
+
 # noinspection PyBroadException
 class Parser:
 
@@ -54,102 +238,78 @@ class Parser:
 
     def __init__(self) -> None:
         self._diagram = cd.Diagram()
+        # References are recorded while streaming and resolved once every element is defined.
+        self._datatype_refs: List[Tuple[cd.TypedElement, str]] = []
+        self._return_type_refs: List[Tuple[cd.Method, str]] = []
+        self._stereotype_refs: List[Tuple[cd.StereotypedElement, Tuple[str, ...]]] = []
+        self._relationship_refs: List[_RelationshipRef] = []
 
     def parse_document(self, file_path: str) -> cd.Diagram:
-        models: Et.Element = Et.parse(file_path).getroot().find(XT.MODELS)
-
-        self._parse_stereotypes(models)
-        self._parse_datatypes(models)
-        self._parse_classes(models)
-        self._parse_packages(models)
-        self._parse_relationships(models)
-
+        for node, package in _definitions(file_path):
+            tag = node.tag
+
+            if tag == XT.CLASS:
+                self._create_class(node, package=self._get_package(package))
+            elif tag in _RELATIONSHIP_TAGS:
+                self._read_relationship(node)
+            elif tag == XT.ASSOCIATION:
+                self._read_association(node)
+            elif tag == XT.STEREOTYPE:
+                self._create_stereotype(node)
+            elif tag == XT.DATATYPE:
+                self._create_datatype(node)
+            else:
+                self._get_package(node)
+
+        self._resolve_references()
         return self._diagram
 
     # Private
 
     @staticmethod
     def _parse_identifier(node: Et.Element, attr: str = XA.ID) -> str:
-        try:
-            return node.attrib[attr]
-        except Exception as e:
-            raise Exception('Node has no identifier: {} {}'.format(node.tag, node.attrib)) from e
+        identifier = node.get(attr)
+
+        if identifier is None:
+            raise Exception('Node has no identifier: {} {}'.format(node.tag, node.attrib))
+
+        return identifier
 
     @staticmethod
     def _parse_name(node: Et.Element) -> str:
-        return node.attrib.get(XA.NAME, '')
+        return sys.intern(node.get(XA.NAME, ''))
 
     @staticmethod
     def _parse_abstract(node: Et.Element) -> bool:
-        return node.attrib.get(XA.ABSTRACT, 'false') == 'true'
+        return node.get(XA.ABSTRACT, 'false') == 'true'
 
     @staticmethod
     def _parse_scope(node: Et.Element) -> cd.Scope:
-        if node.attrib.get(XA.SCOPE, 'instance') == 'instance':
+        if node.get(XA.SCOPE, 'instance') == 'instance':
             return cd.Scope.INSTANCE
         return cd.Scope.CLASS
 
     @staticmethod
-    def _parse_mult(node: Et.Element) -> cd.Multiplicity:
-        mult_str: str = node.attrib[XA.MULTIPLICITY]
-        if mult_str == '0':
-            return cd.Multiplicity.ZERO
-        elif mult_str in ['1', 'Unspecified']:
-            return cd.Multiplicity.ONE
-        elif mult_str in ['*', '0..*']:
-            return cd.Multiplicity.STAR
-        elif mult_str in ['+', '1..*']:
-            return cd.Multiplicity.PLUS
-        elif mult_str.isdigit():
-            return cd.Multiplicity.N
-        else:
-            return cd.Multiplicity.ONE
+    def _parse_mult(node: Et.Element) -> Optional[cd.Multiplicity]:
+        mult_str: Optional[str] = node.get(XA.MULTIPLICITY)
 
-    @staticmethod
-    def _parse_rel_type(node: Et.Element) -> Optional[cd.RelType]:
-        try:
-            return cd.RelType[node.tag.upper()]
-        except Exception:
-            if node.tag == XT.USAGE:
-                return cd.RelType.DEPENDENCY
-            raise
-
-    @staticmethod
-    def _parse_agg_type(node: Et.Element) -> cd.AggType:
-        try:
-            return cd.AggType[node.attrib[XA.AGGREGATION_KIND].upper()]
-        except Exception:
-            return cd.AggType.NONE
-
-    def _parse_packages(self, node: Et.Element) -> None:
-        for package_node in node.findall(XT.PACKAGE):
-            package = self._create_package(package_node)
-
-            for child in package_node.findall(XT.MODEL_CHILDREN):
-                self._parse_classes(child, package=package)
-
-    def _parse_datatypes(self, node: Et.Element) -> None:
-        for model in node.findall(XT.DATATYPE):
-            self._create_datatype(model)
+        if mult_str is None:
+            return None
 
-    def _parse_classes(self, node: Et.Element, package: Optional[cd.Package] = None) -> None:
-        for model in node.findall(XT.CLASS):
-            self._create_class(model, package=package)
+        mult = _MULTIPLICITIES.get(mult_str)
 
-        for model in node.findall(XT.CLASS):
-            self._populate_class(model)
+        if mult is None:
+            mult = cd.Multiplicity.N if mult_str.isdigit() else cd.Multiplicity.ONE
 
-    def _parse_stereotypes(self, node: Et.Element) -> None:
-        for model in node.findall(XT.STEREOTYPE):
-            self._create_stereotype(model)
+        return mult
 
-    def _parse_relationships(self, node: Et.Element) -> None:
-        for tag in [XT.DEPENDENCY, XT.GENERALIZATION, XT.REALIZATION, XT.USAGE]:
-            for child in node.iter(tag):
-                self._create_relationship(child)
+    @staticmethod
+    def _parse_rel_type(node: Et.Element) -> Optional[cd.RelType]:
+        return _REL_TYPES.get(node.tag)
 
-        for child in node.iter(XT.ASSOCIATION):
-            self._create_association(child)
+    @staticmethod
+    def _parse_agg_type(node: Et.Element) -> cd.AggType:
+        return _AGG_TYPES.get(node.get(XA.AGGREGATION_KIND, '').upper(), cd.AggType.NONE)
 
     def _create_package(self, node: Et.Element) -> cd.Package:
         package = cd.Package(
@@ -159,6 +319,14 @@ class Parser:
         self._diagram.add_element(package)
         return package
 
+    def _get_package(self, node: Optional[Et.Element]) -> Optional[cd.Package]:
+        # Packages are defined by their first class, as their node ends after it.
+        if node is None:
+            return None
+
+        package = self._diagram.find(cd.Package, node.get(XA.ID))
+        return package if package else self._create_package(node)
+
     def _create_datatype(self, node: Et.Element) -> cd.Datatype:
         datatype = cd.Datatype(
             identifier=self._parse_identifier(node),
@@ -174,6 +342,7 @@ class Parser:
             abstract=self._parse_abstract(node),
             package=package
         )
+        self._populate_class(cls, node)
         self._diagram.add_element(cls)
         return cls
 
@@ -185,97 +354,163 @@ class Parser:
         self._diagram.add_element(stereotype)
         return stereotype
 
-    def _create_relationship(self, node: Et.Element) -> None:
-        try:
-            relationship = cd.Relationship(
-                identifier=self._parse_identifier(node),
-                rel_type=self._parse_rel_type(node),
-                from_cls=self._diagram.cls(self._parse_identifier(node, attr=XA.FROM)),
-                to_cls=self._diagram.cls(self._parse_identifier(node, attr=XA.TO))
-            )
+    def _read_relationship(self, node: Et.Element) -> None:
+        # Malformed relationships are skipped, dangling ones once resolved.
+        identifier = node.get(XA.ID)
+        rel_type = self._parse_rel_type(node)
 
-            self._add_stereotypes(relationship, node)
-            self._diagram.add_relationship(relationship)
-        except Exception:
+        if not (identifier and rel_type):
             return
 
-    def _create_association(self, node: Et.Element) -> None:
-        try:
-            from_node = node.find(XT.path(XT.FROM_END, XT.ASSOCIATION_END))
-            to_node = node.find(XT.path(XT.TO_END, XT.ASSOCIATION_END))
-
-            from_cls_id = self._parse_identifier(from_node, attr=XA.END_MODEL_ELEMENT)
-            to_cls_id = self._parse_identifier(to_node, attr=XA.END_MODEL_ELEMENT)
-
-            association = cd.Association(
-                identifier=self._parse_identifier(node),
-                agg_type=self._parse_agg_type(from_node),
-                from_cls=self._diagram.cls(from_cls_id),
-                to_cls=self._diagram.cls(to_cls_id),
-                from_mult=self._parse_mult(from_node),
-                to_mult=self._parse_mult(to_node)
-            )
-
-            self._add_stereotypes(association, node)
-            self._diagram.add_relationship(association)
-        except Exception:
+        self._relationship_refs.append(_RelationshipRef(
+            identifier=identifier,
+            rel_type=rel_type,
+            agg_type=None,
+            from_id=node.get(XA.FROM),
+            to_id=node.get(XA.TO),
+            stereotypes=self._parse_stereotype_refs(node)
+        ))
+
+    def _read_association(self, node: Et.Element) -> None:
+        # Malformed associations are skipped, dangling ones once resolved.
+        identifier = node.get(XA.ID)
+        from_node = _first(XQ.FROM_END, node)
+        to_node = _first(XQ.TO_END, node)
+
+        if not identifier or from_node is None or to_node is None:
             return
 
-    def _populate_class(self, node: Et.Element) -> None:
-        cls = self._diagram.cls(self._parse_identifier(node))
-        ch_node = node.find(XT.MODEL_CHILDREN)
+        from_mult = self._parse_mult(from_node)
+        to_mult = self._parse_mult(to_node)
 
-        if ch_node:
-            for child in ch_node.findall(XT.ATTRIBUTE):
-                self._add_attribute(cls, child)
-
-            for child in ch_node.findall(XT.OPERATION):
-                self._add_method(cls, child)
+        if not (from_mult and to_mult):
+            return
 
-        self._add_stereotypes(cls, node)
+        self._relationship_refs.append(_RelationshipRef(
+            identifier=identifier,
+            rel_type=cd.RelType.ASSOCIATION,
+            agg_type=self._parse_agg_type(from_node),
+            from_id=from_node.get(XA.END_MODEL_ELEMENT),
+            to_id=to_node.get(XA.END_MODEL_ELEMENT),
+            from_mult=from_mult,
+            to_mult=to_mult,
+            stereotypes=self._parse_stereotype_refs(node)
+        ))
+
+    def _populate_class(self, cls: cd.Class, node: Et.Element) -> None:
+        ch_node = _first(XQ.MODEL_CHILDREN, node)
+
+        if ch_node is not None:
+            for child in ch_node:
+                if child.tag == XT.ATTRIBUTE:
+                    self._add_attribute(cls, child)
+                elif child.tag == XT.OPERATION:
+                    self._add_method(cls, child)
+
+        self._read_stereotypes(cls, node)
 
     def _add_attribute(self, cls: cd.Class, node: Et.Element) -> None:
         attr = cd.Attribute(
             identifier=self._parse_identifier(node),
             name=self._parse_name(node),
-            datatype=self._get_ref_datatype(node.find(XT.TYPE)),
+            datatype=None,
             scope=self._parse_scope(node)
         )
+        self._read_datatype(attr, _first(XQ.TYPE, node))
         cls.attributes.append(attr)
 
     def _add_method(self, cls: cd.Class, node: Et.Element) -> None:
-        parameters = [
-            cd.Parameter(identifier=self._parse_identifier(child),
-                         name=self._parse_name(child),
-                         datatype=self._get_ref_datatype(child.find(XT.TYPE)))
-            for child in node.iter(XT.PARAMETER)
-        ]
+        parameters = []
+
+        for child in XQ.PARAMETERS(node):
+            param = cd.Parameter(identifier=self._parse_identifier(child),
+                                 name=self._parse_name(child),
+                                 datatype=None)
+            self._read_datatype(param, _first(XQ.TYPE, child))
+            parameters.append(param)
 
         method = cd.Method(
             identifier=self._parse_identifier(node),
             name=self._parse_name(node),
             scope=self._parse_scope(node),
             abstract=self._parse_abstract(node),
-            parameters=parameters,
-            return_type=self._get_ref_datatype(node.find(XT.RET_TYPE))
+            parameters=parameters
         )
 
+        ret_type = self._parse_type_ref(_first(XQ.RET_TYPE, node))
+
+        if ret_type:
+            self._return_type_refs.append((method, ret_type))
+
         cls.methods.append(method)
 
-    def _add_stereotypes(self, element: cd.StereotypedElement, node: Et.Element) -> None:
-        for child in node.findall(XT.path(XT.STEREOTYPES, XT.STEREOTYPE)):
-            stereotype = self._get_ref_stereotype(child)
-            if stereotype:
-                element.stereotypes.append(stereotype)
+    def _read_datatype(self, element: cd.TypedElement, node: Optional[Et.Element]) -> None:
+        ref = self._parse_type_ref(node)
 
-    def _get_ref_datatype(self, node: Et.Element) -> Optional[cd.Datatype]:
-        try:
-            return self._diagram.datatype(self._parse_identifier(node[0], attr=XA.ID_REF))
-        except Exception:
-            return None
+        if ref:
+            self._datatype_refs.append((element, ref))
+
+    def _read_stereotypes(self, element: cd.StereotypedElement, node: Et.Element) -> None:
+        refs = self._parse_stereotype_refs(node)
+
+        if refs:
+            self._stereotype_refs.append((element, refs))
 
-    def _get_ref_stereotype(self, node: Et.Element) -> Optional[cd.Stereotype]:
-        try:
-            return self._diagram.stereotype(self._parse_identifier(node, attr=XA.ID_REF))
-        except Exception:
+    @staticmethod
+    def _parse_type_ref(node: Optional[Et.Element]) -> Optional[str]:
+        if node is None or not len(node):
             return None
+        return node[0].get(XA.ID_REF)
+
+    @staticmethod
+    def _parse_stereotype_refs(node: Et.Element) -> Tuple[str, ...]:
+        return tuple(ref for ref in map(_id_ref, XQ.STEREOTYPE_REFS(node)) if ref)
+
+    def _resolve_references(self) -> None:
+        find = self._diagram.find
+
+        for element, ref in self._datatype_refs:
+            element.datatype = find(cd.Datatype, ref)
+
+        for method, ref in self._return_type_refs:
+            method.return_type = find(cd.Datatype, ref)
+
+        for element, refs in self._stereotype_refs:
+            self._add_stereotypes(element, refs)
+
+        for ref in self._relationship_refs:
+            self._create_relationship(ref)
+
+        self._datatype_refs.clear()
+        self._return_type_refs.clear()
+        self._stereotype_refs.clear()
+        self._relationship_refs.clear()
+
+    def _create_relationship(self, ref: _RelationshipRef) -> None:
+        from_cls = self._diagram.find(cd.Class, ref.from_id)
+        to_cls = self._diagram.find(cd.Class, ref.to_id)
+
+        if not (from_cls and to_cls):
+            return
+
+        if ref.agg_type is None:
+            relationship = cd.Relationship(identifier=ref.identifier, rel_type=ref.rel_type,
+                                           from_cls=from_cls, to_cls=to_cls)
+        else:
+            relationship = cd.Association(
+                identifier=ref.identifier,
+                agg_type=ref.agg_type,
+                from_cls=from_cls,
+                to_cls=to_cls,
+                from_mult=ref.from_mult,
+                to_mult=ref.to_mult
+            )
+
+        self._add_stereotypes(relationship, ref.stereotypes)
+        self._diagram.add_relationship(relationship)
+
+    def _add_stereotypes(self, element: cd.StereotypedElement, refs: Tuple[str, ...]) -> None:
+        for ref in refs:
+            stereotype = self._diagram.find(cd.Stereotype, ref)
+            if stereotype:
+                element.add_stereotype(stereotype)
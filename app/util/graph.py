@@ -0,0 +1,90 @@
+from collections import deque
+from typing import Dict, Iterator, List, Set
+
+# Nodes are dense integer indices, adj[n] lists the successors of node n.
+Adjacency = List[List[int]]
+
+
+def strongly_connected_components(adj: Adjacency) -> Iterator[List[int]]:
+    """Enumerates the strongly connected components of the graph (iterative Tarjan)."""
+    index: Dict[int, int] = {}
+    lowlink: Dict[int, int] = {}
+    on_stack: Set[int] = set()
+    scc_stack: List[int] = []
+
+    for root in range(len(adj)):
+        if root in index:
+            continue
+
+        index[root] = lowlink[root] = len(index)
+        scc_stack.append(root)
+        on_stack.add(root)
+        stack = [(root, iter(adj[root]))]
+
+        while stack:
+            node, succ_iter = stack[-1]
+            succ = next(succ_iter, None)
+
+            if succ is not None:
+                if succ not in index:
+                    index[succ] = lowlink[succ] = len(index)
+                    scc_stack.append(succ)
+                    on_stack.add(succ)
+                    stack.append((succ, iter(adj[succ])))
+                elif succ in on_stack:
+                    lowlink[node] = min(lowlink[node], index[succ])
+                continue
+
+            stack.pop()
+
+            if stack:
+                parent = stack[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+            if lowlink[node] == index[node]:
+                component = []
+
+                while True:
+                    member = scc_stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+
+                    if member == node:
+                        break
+
+                component.reverse()
+                yield component
+
+
+def has_cycle(adj: Adjacency, component: List[int]) -> bool:
+    return len(component) > 1 or component[0] in adj[component[0]]
+
+
+def cycles_through(adj: Adjacency, start: int, component: Set[int]) -> Iterator[List[int]]:
+    """
+    Yields one cycle through start for each of its predecessors in the component,
+    following the breadth-first search tree rooted at start.
+    """
+    parents = {start: start}
+    fringe = deque((start,))
+
+    while fringe:
+        node = fringe.popleft()
+
+        for succ in adj[node]:
+            if succ == start:
+                yield _path(parents, start, node)
+            elif succ in component and succ not in parents:
+                parents[succ] = node
+                fringe.append(succ)
+
+
+def _path(parents: Dict[int, int], start: int, node: int) -> List[int]:
+    path = [node]
+
+    while node != start:
+        node = parents[node]
+        path.append(node)
+
+    path.reverse()
+    return path
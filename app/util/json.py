@@ -1,26 +1,47 @@
 import json
-from itertools import groupby
-from typing import Iterable
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 from app.cycle.finder import Cycle
 from app.metric.model import Metric
 from app.pattern.model import Pattern
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Attribute encoders per pattern type, inferred from its first instance.
+_schemas: Dict[type, List[Tuple[str, Callable]]] = {}
+
+
+def _encode_iterable(iterable: Iterable) -> List[str]:
+    return [str(i) for i in iterable]
+
+
+def _to_primitive(o):
+    if isinstance(o, Pattern):
+        schema = _schemas.get(type(o))
+
+        if schema is None:
+            schema = [(a, _encode_iterable if isinstance(v, Iterable) else str)
+                      for a, v in o.__dict__.items()]
+            _schemas[type(o)] = schema
+
+        return {a: encode_attr(getattr(o, a)) for a, encode_attr in schema}
+    elif isinstance(o, Cycle):
+        return o.involved_classes
+    elif hasattr(o, 'name'):
+        return o.name
+
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
 
 class CustomJSONEncoder(json.JSONEncoder):
 
     def default(self, o):
-        if isinstance(o, Pattern):
-            return {
-                a: [str(i) for i in v] if isinstance(v, Iterable) else str(v)
-                for a, v in o.__dict__.items()
-            }
-        elif isinstance(o, Cycle):
-            return o.involved_classes
-        elif hasattr(o, 'name'):
-            return o.name
-
-        return json.JSONEncoder.default(self, o)
+        return _to_primitive(o)
 
 
 def load(path: str):
@@ -28,23 +49,47 @@ def load(path: str):
         return json.load(json_file)
 
 
-def encode(obj, output_file: str) -> None:
-    with open(output_file, mode='w') as out:
-        json.dump(obj, out, cls=CustomJSONEncoder, indent=2)
+def encode(obj, output_file: str, indent: Optional[int] = None) -> None:
+    # orjson only supports two-space indentation.
+    if HAS_ORJSON and indent in (None, 2):
+        option = orjson.OPT_INDENT_2 if indent else 0
+
+        with open(output_file, mode='wb') as out:
+            out.write(orjson.dumps(obj, default=_to_primitive, option=option))
+    else:
+        _encode_std(obj, output_file, indent=indent)
+
+
+def _encode_std(obj, output_file: str, indent: Optional[int] = None) -> None:
+    # Only json.dumps runs the C encoder (json.dump never does), and only without indentation.
+    separators = (',', ':') if indent is None else None
+
+    # Non-ASCII characters are written as UTF-8, like orjson does.
+    with open(output_file, mode='w', encoding='utf-8') as out:
+        out.write(json.dumps(obj, cls=CustomJSONEncoder, indent=indent, separators=separators,
+                             ensure_ascii=False))
+
+
+def encode_patterns(patterns: Iterable[Pattern], output_file: str,
+                    indent: Optional[int] = None) -> None:
+    obj = defaultdict(list)
 
+    for p in patterns:
+        obj[p.name].append(p)
 
-def encode_patterns(patterns: Iterable[Pattern], output_file: str) -> None:
-    obj = dict((k, list(v)) for k, v in groupby(patterns, lambda p: p.name))
-    encode(obj, output_file)
+    encode(obj, output_file, indent=indent)
 
 
-def encode_cycles(cycles: Iterable[Cycle], output_file: str) -> None:
-    encode_iterable(cycles, output_file)
+def encode_cycles(cycles: Iterable[Cycle], output_file: str,
+                  indent: Optional[int] = None) -> None:
+    encode_iterable(cycles, output_file, indent=indent)
 
 
-def encode_metrics(metrics: Iterable[Metric], output_file: str) -> None:
-    encode({m.identifier: m.value for m in metrics}, output_file)
+def encode_metrics(metrics: Iterable[Metric], output_file: str,
+                   indent: Optional[int] = None) -> None:
+    # Metric values may be infinite, which orjson would silently encode as null.
+    _encode_std({m.identifier: m.value for m in metrics}, output_file, indent=indent)
 
 
-def encode_iterable(iterable: Iterable, output_file: str) -> None:
-    encode(list(iterable), output_file)
+def encode_iterable(iterable: Iterable, output_file: str, indent: Optional[int] = None) -> None:
+    encode(list(iterable), output_file, indent=indent)